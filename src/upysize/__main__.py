@@ -2,81 +2,72 @@ from __future__ import annotations
 
 import hashlib
 import json
+import os
+import pickle
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Callable, Iterator, TextIO, TypedDict
+from typing import TextIO, TypedDict
 
 import click
 
-from .strategies import Settings, SpaceSaving
-from .strategies.constants_local_only import local_only_constants
-from .strategies.constants_no_const import no_const_number
-from .strategies.function_inline import function_inline
-from .strategies.import_global_cache import global_import_cache
-from .strategies.import_one_function import one_function_import
-from .strategies.import_type_only import type_only_import
-from .strategies.keyword_arguments import keyword_arguments
-from .strategies.local_cache_attribute import local_cache_attribute
-from .strategies.local_cache_global import local_cache_global
-from .strategies.small_classes import init_only_classes
+from .analysis import FileData, FileResults, analyze_file
+from .strategies import SLOTS
 
 
-class ValidatorResult(TypedDict):
-    """Individual result of a validator/strategy."""
-
-    validator_name: str
-    saved_bytes: int
-    lines: list[str]
-
-
-class FileResults(TypedDict):
-    """Results for a single file.
+class IgnoreData(TypedDict):
+    """Data saved in a JSON file to ignore certain warnings in certain files.
 
-    This data-structure gets saved to a JSON file as cache.
+    So far supported only for function inlining, but could be extended.
     """
 
-    abs_file_path: str
-    saved_bytes: int
-    results: list[ValidatorResult]
-    file_hash: str
+    function_inline: dict[str, list[str]]
 
 
-class IgnoreData(TypedDict):
-    """Data saved in a JSON file to ignore certain warnings in certain files.
+class PathSuffixIndex:
+    """Values assigned to file paths, matched according to path endings.
 
-    So far supported only for function inlining, but could be extended.
+    Compiled once, so that a lookup only tries the suffix lengths present
+    in the data, instead of matching the path against all the entries.
+    When more of the entries match, the first one defined wins.
     """
 
-    function_inline: dict[str, list[str]]
+    def __init__(self, data: dict[str, list[str]]) -> None:
+        self.data = data
+        self.order = {suffix: index for index, suffix in enumerate(data)}
+        self.lengths = sorted({len(suffix) for suffix in data})
+
+    def get(self, path: str) -> list[str] | None:
+        matches: list[str] = []
+        for length in self.lengths:
+            if length > len(path):
+                break
+            start = len(path) - length
+            if path[start:] in self.data:
+                matches.append(path[start:])
+
+        if not matches:
+            return None
+        return self.data[min(matches, key=self.order.__getitem__)]
 
 
-@dataclass
+@dataclass(**SLOTS)
 class UserOptions:
     """Holds user input from CLI."""
 
     ignore_data: IgnoreData | None
+    uninlinable_funcs: PathSuffixIndex | None = None
 
-
-HERE = Path(__file__).parent
-CACHE_FILE = HERE / "cache.json"
-
-# TODO: resolve the type errors
-VALIDATORS: list[Callable[[str, Settings], list[SpaceSaving]]] = [  # type: ignore
-    function_inline,  # type: ignore
-    global_import_cache,  # type: ignore
-    one_function_import,  # type: ignore
-    type_only_import,  # type: ignore
-    keyword_arguments,  # type: ignore
-    local_cache_attribute,  # type: ignore
-    local_cache_global,  # type: ignore
-    local_only_constants,  # type: ignore
-    no_const_number,  # type: ignore
-    init_only_classes,  # type: ignore
-]
+    def __post_init__(self) -> None:
+        if self.ignore_data is not None:
+            self.uninlinable_funcs = PathSuffixIndex(
+                self.ignore_data["function_inline"]
+            )
 
 
-UNEXPECTED_ERRORS: list[str] = []
+HERE = Path(__file__).parent
+CACHE_FILE = HERE / "cache.pkl"
 
 
 class ResultCache:
@@ -91,6 +82,7 @@ class ResultCache:
         self.cache = cache
         self.cache_file = cache_file
         self.force_invalid = force_invalid
+        self.dirty = False
 
     def __enter__(self) -> ResultCache:
         return self
@@ -103,10 +95,10 @@ class ResultCache:
         if not cache_file.exists():
             return cls({}, cache_file, force_invalid)
 
-        with open(cache_file, "r") as f:
+        with open(cache_file, "rb") as f:
             try:
-                return cls(json.load(f), cache_file, force_invalid)
-            except json.JSONDecodeError:
+                return cls(pickle.load(f), cache_file, force_invalid)
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
                 return cls({}, cache_file, force_invalid)
 
     def is_valid(self, file_path: str, file_hash: str) -> bool:
@@ -117,18 +109,46 @@ class ResultCache:
             file_path in self.cache and self.cache[file_path]["file_hash"] == file_hash
         )
 
+    def is_unchanged(self, file_path: str, mtime_ns: int, size: int) -> bool:
+        """Quick check whether the file was not touched since its results were cached.
+
+        Allows for skipping the reading and hashing of the file.
+        """
+        if self.force_invalid or file_path not in self.cache:
+            return False
+
+        file_results = self.cache[file_path]
+        return (
+            file_results.get("mtime_ns") == mtime_ns
+            and file_results.get("size") == size
+        )
+
     def get(self, file_path: str) -> FileResults:
         return self.cache[file_path]
 
     def set(self, file_path: str, file_results: FileResults) -> None:
         self.cache[file_path] = file_results
+        self.dirty = True
 
     def save(self) -> None:
-        with open(self.cache_file, "w") as f:
-            json.dump(self.cache, f, indent=4)
+        """Saves the cache, when there is something new in it.
+
+        Writing into a temporary file first, so that the cache file
+        does not get corrupted when the process is interrupted.
+        """
+        if not self.dirty:
+            return
+
+        tmp_file = self.cache_file.with_suffix(".tmp")
+        with open(tmp_file, "wb") as f:
+            pickle.dump(self.cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self.cache_file)
+        self.dirty = False
 
 
-def get_uninlinable_functions(file_path: Path, ignore_data: IgnoreData) -> list[str]:
+def get_uninlinable_functions(
+    abs_path: str, funcs_to_not_inline: PathSuffixIndex
+) -> list[str]:
     """Get a list of functions that should not be inlined.
 
     Matches filepaths in ignore file with absolute path according to their endings.
@@ -138,14 +158,7 @@ def get_uninlinable_functions(file_path: Path, ignore_data: IgnoreData) -> list[
     # TODO: generalize this function to work with all ignore_data
     # and getting just relevant data for given file
 
-    funcs_to_not_inline = ignore_data["function_inline"]
-
-    file_abs_path = str(file_path.absolute())
-    for file, functions in funcs_to_not_inline.items():
-        if file_abs_path.endswith(file):
-            return functions
-
-    return []
+    return funcs_to_not_inline.get(abs_path) or []
 
 
 def report_file_results(file_results: FileResults) -> None:
@@ -165,81 +178,94 @@ def report_file_results(file_results: FileResults) -> None:
     print(80 * "*")
 
 
-def analyze_file(file_path: Path, cache: ResultCache, options: UserOptions) -> int:
-    """Main function for analyzing a single file.
-
-    Handles cache lookup according to file-hash and analyses
-    the file only if the cache is not valid.
-
-    Reports file results and returns the amount of saved bytes in this file.
-    """
-    with open(file_path, "r") as f:
-        file_content = f.read()
-
-    abs_path = str(file_path.absolute())
-    file_hash = hashlib.md5(file_content.encode()).hexdigest()
+def load_file(
+    file_path: Path, abs_path: str, stat: os.stat_result, options: UserOptions
+) -> FileData:
+    """Reads a single file and prepares all the data for its analysis."""
+    # Hashing the raw bytes, decoding them only once for validators
+    raw_content = file_path.read_bytes()
+    file_hash = hashlib.blake2b(raw_content, digest_size=16).hexdigest()
+    file_content = raw_content.decode("utf-8")
 
-    if cache.is_valid(abs_path, file_hash):
-        file_results = cache.get(abs_path)
-    else:
-        results = get_file_results(file_content, file_path, options)
-        saved_bytes = sum(r["saved_bytes"] for r in results)
-        file_results = FileResults(
-            abs_file_path=abs_path,
-            saved_bytes=saved_bytes,
-            results=results,
-            file_hash=file_hash,
+    # List of functions that cannot be inlined for this file, if any
+    # TODO: send all the ignore data connected with this file_path
+    if options.uninlinable_funcs:
+        not_inlineable_funcs = get_uninlinable_functions(
+            abs_path, options.uninlinable_funcs
         )
-        cache.set(abs_path, file_results)
+    else:
+        not_inlineable_funcs = []
 
-    report_file_results(file_results)
+    return FileData(
+        abs_path=abs_path,
+        file_hash=file_hash,
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        file_content=file_content,
+        not_inlineable_funcs=not_inlineable_funcs,
+    )
 
-    return file_results["saved_bytes"]
 
+def analyze_files(
+    files: list[Path], cache: ResultCache, options: UserOptions, jobs: int
+) -> tuple[int, list[str]]:
+    """Main function for analyzing all the files.
 
-def get_file_results(
-    file_content: str, file_path: Path, options: UserOptions
-) -> list[ValidatorResult]:
-    """Runs a series of validators on a file and returns the results.
+    Handles cache lookup according to file modification time/size
+    and file-hash and analyses only the files whose cache is not valid
+    - in parallel, when there is more of them.
 
-    All validators are run with the file content and also with the
-    `Settings` object as a way to pass additional information to the validators.
+    Reports file results and returns the amount of saved bytes in all files,
+    together with all the unexpected errors that happened during analysis.
     """
-
-    # List of functions that cannot be inlined for this file, if any
-    # TODO: send all the ignore data connected with this file_path
-    if options.ignore_data:
-        not_inlineable_funcs = get_uninlinable_functions(file_path, options.ignore_data)
+    all_results: dict[str, FileResults] = {}
+    unexpected_errors: list[str] = []
+    to_analyze: list[FileData] = []
+    abs_paths: list[str] = []
+
+    for file_path in files:
+        abs_path = str(file_path.absolute())
+        abs_paths.append(abs_path)
+
+        stat = file_path.stat()
+        if cache.is_unchanged(abs_path, stat.st_mtime_ns, stat.st_size):
+            all_results[abs_path] = cache.get(abs_path)
+            continue
+
+        file_data = load_file(file_path, abs_path, stat, options)
+        if cache.is_valid(abs_path, file_data.file_hash):
+            # Content is the same, only remembering the new file stats
+            file_results = cache.get(abs_path).copy()
+            file_results["mtime_ns"] = file_data.mtime_ns
+            file_results["size"] = file_data.size
+            cache.set(abs_path, file_results)
+            all_results[abs_path] = file_results
+        else:
+            to_analyze.append(file_data)
+
+    workers = jobs or os.cpu_count() or 1
+    if workers > 1 and len(to_analyze) > 1:
+        # Biggest files first, so that no worker is left with
+        # a big file at the end, when others are already done
+        to_analyze.sort(key=lambda file_data: file_data.size, reverse=True)
+        chunksize = max(1, len(to_analyze) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            analyzed = list(executor.map(analyze_file, to_analyze, chunksize=chunksize))
     else:
-        not_inlineable_funcs = []
-
-    FILE_SETTINGS = Settings(file_path, not_inlineable_funcs)
-
-    def iterator() -> Iterator[ValidatorResult]:
-        for validator in VALIDATORS:
-            # Error handling so that it is usable even for untested codebases,
-            # where one uncaught error does not stop the whole process
-            try:
-                result = validator(file_content, FILE_SETTINGS)
-            except Exception as e:
-                report_uncaught_error(validator.__name__, str(file_path), str(e))
-                continue
-
-            if result:
-                yield ValidatorResult(
-                    validator_name=validator.__name__,
-                    saved_bytes=sum(p.saved_bytes() for p in result),
-                    lines=[str(p) for p in result],
-                )
+        analyzed = [analyze_file(file_data) for file_data in to_analyze]
 
-    return list(iterator())
+    for file_results, errors in analyzed:
+        abs_path = file_results["abs_file_path"]
+        cache.set(abs_path, file_results)
+        all_results[abs_path] = file_results
+        unexpected_errors.extend(errors)
 
+    # Reporting in the original order of files
+    for abs_path in abs_paths:
+        report_file_results(all_results[abs_path])
 
-def report_uncaught_error(validator_name: str, file_path: str, err: str) -> None:
-    """Process unexpected error by appending it to the list of errors."""
-    UNEXPECTED_ERRORS.append(f"Error happened while validating file {file_path}")
-    UNEXPECTED_ERRORS.append(f"Validator: {validator_name}")
-    UNEXPECTED_ERRORS.append(f"Err: {err}")
+    saved_bytes = sum(all_results[abs_path]["saved_bytes"] for abs_path in abs_paths)
+    return saved_bytes, unexpected_errors
 
 
 @click.command()
@@ -251,7 +277,16 @@ def report_uncaught_error(validator_name: str, file_path: str, err: str) -> None
     type=click.File("r"),
     help="File with warnings that should be ignored.",
 )
-def main(path: str | Path, no_cache: bool, ignore_file: TextIO | None) -> None:
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Number of parallel processes (0 = autodetect from CPU count).",
+)
+def main(
+    path: str | Path, no_cache: bool, ignore_file: TextIO | None, jobs: int
+) -> None:
     # TODO: `output` optionally specifying file where to save the result
     # TODO: `exclude` for not analyzing specific files/patterns
     # TODO: `validator` for running only specific validator
@@ -260,17 +295,17 @@ def main(path: str | Path, no_cache: bool, ignore_file: TextIO | None) -> None:
     path = Path(path)
     options = UserOptions(ignore_data=json.load(ignore_file) if ignore_file else None)
 
-    possible_saved_bytes = 0
-    file_iterable = path.rglob("*.py") if path.is_dir() else [path]
+    files = list(path.rglob("*.py")) if path.is_dir() else [path]
 
     with ResultCache.load(CACHE_FILE, force_invalid=no_cache) as cache:
-        for file in file_iterable:
-            possible_saved_bytes += analyze_file(file, cache, options)
+        possible_saved_bytes, unexpected_errors = analyze_files(
+            files, cache, options, jobs
+        )
 
     print(f"Potentially saved bytes: {possible_saved_bytes}")
 
-    if UNEXPECTED_ERRORS:
-        for line in UNEXPECTED_ERRORS:
+    if unexpected_errors:
+        for line in unexpected_errors:
             print(line)
         print("ERROR: There was some unexpected issue. Please check the output above.")
         sys.exit(1)
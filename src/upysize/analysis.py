@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, Sequence, TypedDict
+
+from .strategies import SLOTS, Settings, SpaceSaving
+from .strategies.constants_local_only import local_only_constants
+from .strategies.constants_no_const import no_const_number
+from .strategies.function_inline import function_inline
+from .strategies.helpers import clear_caches
+from .strategies.import_global_cache import global_import_cache
+from .strategies.import_one_function import one_function_import
+from .strategies.import_type_only import type_only_import
+from .strategies.keyword_arguments import keyword_arguments
+from .strategies.local_cache_attribute import local_cache_attribute
+from .strategies.local_cache_global import local_cache_global
+from .strategies.small_classes import init_only_classes
+
+# Everything run in the worker processes lives here and not in `__main__`,
+# which is not importable by name in the processes started by
+# the "spawn" and "forkserver" methods when run as `python -m upysize`.
+
+
+class ValidatorResult(TypedDict):
+    """Individual result of a validator/strategy."""
+
+    validator_name: str
+    saved_bytes: int
+    lines: list[str]
+
+
+class FileResults(TypedDict):
+    """Results for a single file.
+
+    This data-structure gets saved to a (pickle) file as cache.
+    """
+
+    abs_file_path: str
+    saved_bytes: int
+    results: list[ValidatorResult]
+    file_hash: str
+    mtime_ns: int
+    size: int
+
+
+@dataclass(**SLOTS)
+class FileData:
+    """Everything needed for analyzing a single file (possibly in another process)."""
+
+    abs_path: str
+    file_hash: str
+    mtime_ns: int
+    size: int
+    file_content: str
+    not_inlineable_funcs: list[str]
+
+
+ValidatorFunc = Callable[[str, Settings], Sequence[SpaceSaving]]
+Precondition = Callable[[str], bool]
+Validator = tuple[str, ValidatorFunc, Precondition]
+
+
+def _contains(substring: str) -> Precondition:
+    return lambda file_content: substring in file_content
+
+
+def _validator(func: ValidatorFunc, precondition: Precondition) -> Validator:
+    return func.__name__, func, precondition
+
+
+# Validators with their names and cheap checks whether the validator
+# can find anything in the file at all, so that it is not run
+# (and does not walk the AST) when it cannot.
+VALIDATORS: tuple[Validator, ...] = (
+    _validator(function_inline, _contains("def")),
+    _validator(global_import_cache, _contains("import")),
+    _validator(one_function_import, _contains("import")),
+    # Symbols other than imports (constants, functions) can be type-only too,
+    # but any annotation needs a colon
+    _validator(type_only_import, _contains(":")),
+    _validator(keyword_arguments, _contains("=")),
+    _validator(local_cache_attribute, _contains("def")),
+    _validator(local_cache_global, _contains("def")),
+    _validator(local_only_constants, _contains("const")),
+    _validator(no_const_number, _contains("=")),
+    _validator(init_only_classes, _contains("class")),
+)
+
+
+def analyze_file(file_data: FileData) -> tuple[FileResults, list[str]]:
+    """Analyses a single file, possibly in a separate process.
+
+    Does not touch any shared state - the unexpected errors
+    encountered are returned together with the file results.
+    """
+    errors: list[str] = []
+    results = get_file_results(
+        file_data.file_content,
+        Path(file_data.abs_path),
+        file_data.not_inlineable_funcs,
+        errors,
+    )
+    # Helper results are not reusable for other files
+    clear_caches()
+
+    saved_bytes = sum([r["saved_bytes"] for r in results])
+    file_results = FileResults(
+        abs_file_path=file_data.abs_path,
+        saved_bytes=saved_bytes,
+        results=results,
+        file_hash=file_data.file_hash,
+        mtime_ns=file_data.mtime_ns,
+        size=file_data.size,
+    )
+    return file_results, errors
+
+
+def get_file_results(
+    file_content: str,
+    file_path: Path,
+    not_inlineable_funcs: list[str],
+    errors: list[str],
+) -> list[ValidatorResult]:
+    """Runs a series of validators on a file and returns the results.
+
+    All validators are run with the file content and also with the
+    `Settings` object as a way to pass additional information to the validators.
+
+    Unexpected errors of validators are appended to `errors`.
+    """
+    FILE_SETTINGS = Settings(file_path, not_inlineable_funcs)
+
+    def iterator() -> Iterator[ValidatorResult]:
+        for validator_name, validator, precondition in VALIDATORS:
+            if not precondition(file_content):
+                continue
+
+            # Error handling so that it is usable even for untested codebases,
+            # where one uncaught error does not stop the whole process
+            try:
+                result = validator(file_content, FILE_SETTINGS)
+            except Exception as e:
+                report_uncaught_error(errors, validator_name, str(file_path), str(e))
+                continue
+
+            if result:
+                yield ValidatorResult(
+                    validator_name=validator_name,
+                    saved_bytes=sum([p.saved_bytes() for p in result]),
+                    lines=[str(p) for p in result],
+                )
+
+    return list(iterator())
+
+
+def report_uncaught_error(
+    errors: list[str], validator_name: str, file_path: str, err: str
+) -> None:
+    """Process unexpected error by appending it to the list of errors."""
+    errors.append(f"Error happened while validating file {file_path}")
+    errors.append(f"Validator: {validator_name}")
+    errors.append(f"Err: {err}")
@@ -1,16 +1,24 @@
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Protocol
+from typing import Any, Protocol
+
+# Dataclasses without `__dict__` take less memory and have faster
+# attribute access - but `slots` are supported only from python 3.10
+SLOTS: dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
 
 
 class SpaceSaving(Protocol):
+    # So that the slots of subclasses are not accompanied by `__dict__`
+    __slots__ = ()
+
     def saved_bytes(self) -> int:  # pragma: no cover
         ...
 
 
-@dataclass
+@dataclass(**SLOTS)
 class Settings:
     file_path: Path = Path(".")
     not_inlineable_funcs: list[str] = field(default_factory=list)
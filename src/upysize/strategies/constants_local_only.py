@@ -3,11 +3,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Iterator
 
-from . import Settings, SpaceSaving
+from . import SLOTS, Settings, SpaceSaving
 from .helpers import all_constants, all_toplevel_symbol_usages
 
 
-@dataclass
+@dataclass(**SLOTS)
 class LocalConstant(SpaceSaving):
     name: str
     usages: int
@@ -3,11 +3,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Iterator
 
-from . import Settings, SpaceSaving
+from . import SLOTS, Settings, SpaceSaving
 from .helpers import all_global_assignments, get_variable_name, is_a_constant_number_var
 
 
-@dataclass
+@dataclass(**SLOTS)
 class NoConstNumber(SpaceSaving):
     name: str
 
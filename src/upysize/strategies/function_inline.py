@@ -3,11 +3,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Iterator
 
-from . import Settings, SpaceSaving
-from .helpers import Function, all_functions, get_function_call_amounts
+from . import SLOTS, Settings, SpaceSaving
+from .helpers import Function, scan_functions_and_calls
 
 
-@dataclass
+@dataclass(**SLOTS)
 class InlineFunction(SpaceSaving):
     func: Function
 
@@ -33,16 +33,16 @@ def function_inline(
 
     def iterator() -> Iterator[InlineFunction]:
         not_to_report = settings.not_inlineable_funcs
-        function_calls = get_function_call_amounts(file_content)
+        functions, function_calls = scan_functions_and_calls(file_content)
 
         # Looking whether the function is called EXACTLY once in this file
         # (it indicates it MIGHT BE a one-time helper function)
         # (it might be used also elsewhere, but searching it would be quite hard)
-        for func in all_functions(file_content):
+        for func in functions:
             if func.name in not_to_report:
                 continue
 
             if func.name in function_calls and function_calls[func.name] == 1:
                 yield InlineFunction(func)
 
-    return sorted(list(iterator()), key=lambda x: x.func.line_no)
+    return sorted(iterator(), key=lambda x: x.func.line_no)
@@ -1,21 +1,33 @@
 from __future__ import annotations
 
 import ast
-from collections import defaultdict
-from copy import deepcopy
+import re
+from collections import Counter, defaultdict, deque
 from dataclasses import dataclass
 from functools import lru_cache
-from typing import TYPE_CHECKING, Iterable, Iterator, Type
+from itertools import accumulate
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Type, TypeVar, cast
 
 from typing_extensions import TypeAlias, TypeGuard
 
+from . import SLOTS
+
 if TYPE_CHECKING:  # pragma: no cover
+    from functools import _lru_cache_wrapper
+
     FuncAst: TypeAlias = ast.FunctionDef | ast.AsyncFunctionDef  # type: ignore
     ImportAst: TypeAlias = ast.Import | ast.ImportFrom  # type: ignore
 
 
+# Public for `isinstance` checks outside of this module
 FUNC_ASTS = (ast.FunctionDef, ast.AsyncFunctionDef)
 IMPORT_ASTS = (ast.Import, ast.ImportFrom)
+# For `type(node) in ...` checks in loops over many nodes - cheaper than
+# `isinstance` with a tuple, and the parser never creates subclasses
+_FUNC_TYPES: frozenset[Type[ast.AST]] = frozenset(FUNC_ASTS)
+_IMPORT_TYPES: frozenset[Type[ast.AST]] = frozenset(IMPORT_ASTS)
+# Fields holding type annotations (of arguments, variables and function returns)
+_TYPE_ANNOTATION_FIELDS = ("annotation", "returns")
 
 # Caching results of frequently called functions
 # (those starting with "all" prefix), as some of those
@@ -23,10 +35,37 @@ IMPORT_ASTS = (ast.Import, ast.ImportFrom)
 # with the same input (file content).
 # Small size is enough because at one time, only one file
 # is being processed.
-cache = lru_cache(maxsize=4)
+# Results of per-function helpers (taking a function node)
+# are cached with a bigger size, to hold all functions of a file.
+# All caches are cleared by `clear_caches` after each file.
+T = TypeVar("T")
+NodeT = TypeVar("NodeT", bound=ast.AST)
+
+_CACHED_FUNCTIONS: list[_lru_cache_wrapper] = []
+
+
+def _registered_cache(
+    maxsize: int,
+) -> Callable[[Callable[..., T]], _lru_cache_wrapper[T]]:
+    def decorator(func: Callable[..., T]) -> _lru_cache_wrapper[T]:
+        cached_func = lru_cache(maxsize=maxsize)(func)
+        _CACHED_FUNCTIONS.append(cached_func)
+        return cached_func
+
+    return decorator
 
 
-@dataclass
+cache = _registered_cache(maxsize=4)
+func_cache = _registered_cache(maxsize=256)
+
+
+def clear_caches() -> None:
+    """Drop all the cached results, so they do not keep old ASTs alive."""
+    for cached_func in _CACHED_FUNCTIONS:
+        cached_func.cache_clear()
+
+
+@dataclass(**SLOTS)
 class Function:
     """Basic information about a function definition."""
 
@@ -38,6 +77,11 @@ class Function:
     def __repr__(self) -> str:  # pragma: no cover
         return f"{self.line_no} :: {self.name} ({self.loc} LOC)"
 
+    @property
+    def position(self) -> tuple[int, int]:
+        """Line and column of the definition, identifying it in the file."""
+        return _function_position(self.node)
+
     @classmethod
     def from_node(cls, node: FuncAst) -> Function:
         return cls(
@@ -48,18 +92,45 @@ class Function:
         )
 
 
-@dataclass
+@dataclass(frozen=True, **SLOTS)
 class CacheCandidate:
-    """String/attribute lookup that can be cached."""
+    """Symbol/attribute lookup that can be cached.
 
-    cache_string: str
+    `attr` is None when the symbol itself is the candidate.
+    """
+
+    obj: str
     amount: int
+    attr: str | None = None
+
+    @property
+    def cache_string(self) -> str:
+        if self.attr is None:
+            return self.obj
+        return f"{self.obj}.{self.attr}"
 
     def __repr__(self) -> str:  # pragma: no cover
         return f"{self.cache_string} ({self.amount}x)"
 
 
-@dataclass
+@dataclass(**SLOTS)
+class FunctionStats:
+    """What happens with attributes and symbols inside a function."""
+
+    attr_lookups: dict[str, dict[str, int]]
+    modified_attrs: set[tuple[str, str]]
+    assigned_symbols: set[str]
+
+
+@dataclass(**SLOTS)
+class FunctionSymbols:
+    """Symbols used (outside of type hints) and imported inside a function."""
+
+    usages: dict[str, int]
+    imported: list[str]
+
+
+@dataclass(**SLOTS)
 class SymbolUsageInFunction:
     """How many times a symbol is used in a function."""
 
@@ -67,25 +138,82 @@ class SymbolUsageInFunction:
     usages: int
 
 
+@cache
+def _parse(file_content: str) -> ast.Module:
+    """Parsed AST of the file.
+
+    Shared by all the helpers (and therefore all validators),
+    so that each file is parsed only once.
+    The tree must not be modified in place, see `remove_type_annotation`.
+
+    Identifiers in the tree (`Name.id`, `Attribute.attr`, `alias.name`, ...)
+    are already interned by the CPython parser, so there is no need
+    to `sys.intern` them before using them as dictionary keys.
+    """
+    return ast.parse(file_content)
+
+
 @cache
 def all_nodes(file_content: str) -> list[ast.AST]:
     """All AST nodes in the file."""
-    return list(ast.walk(ast.parse(file_content)))
+    return list(_walk(_parse(file_content)))
+
+
+@cache
+def _node_index(file_content: str) -> dict[Type[ast.AST], list[ast.AST]]:
+    """All AST nodes in the file, grouped by their type.
+
+    Built in one walk, so that helpers interested only in some
+    types of nodes do not need to go through all the nodes.
+    """
+    index: dict[Type[ast.AST], list[ast.AST]] = defaultdict(list)
+    for node in all_nodes(file_content):
+        index[type(node)].append(node)
+
+    return index
+
+
+def _nodes_of_type(file_content: str, node_type: Type[NodeT]) -> list[NodeT]:
+    """All AST nodes of the given type in the file (in the order of `all_nodes`)."""
+    return cast("list[NodeT]", _node_index(file_content).get(node_type, []))
+
+
+@cache
+def _all_function_nodes(file_content: str) -> list[FuncAst]:
+    """All function definition nodes in the file, ordered by line."""
+    return _function_nodes_in(_node_index(file_content))
+
+
+def _function_nodes_in(index: dict[Type[ast.AST], list[ast.AST]]) -> list[FuncAst]:
+    """All function definition nodes in the node index, ordered by line."""
+    nodes = cast(
+        "list[FuncAst]",
+        [*index.get(ast.FunctionDef, []), *index.get(ast.AsyncFunctionDef, [])],
+    )
+    return sorted(nodes, key=lambda node: node.lineno)
 
 
 @cache
 def all_toplevel_nodes(file_content: str) -> list[ast.AST]:
     """All module's top-level AST nodes in the file."""
-    return list(ast.parse(file_content).body)
+    return list(_parse(file_content).body)
+
+
+def all_call_nodes(file_content: str) -> list[ast.Call]:
+    """All function call nodes in the file."""
+    return _nodes_of_type(file_content, ast.Call)
 
 
 @cache
-def all_global_symbols(file_content: str) -> list[str]:
-    """All global symbols in the file."""
+def all_global_symbols(file_content: str) -> frozenset[str]:
+    """All global symbols in the file.
+
+    A set, as it is used mostly for membership checks in loops over many nodes.
+    """
     imported = all_toplevel_imported_symbols(file_content)
     constants = all_constants(file_content)
     functions = all_function_names(file_content)
-    return imported + constants + functions
+    return frozenset(imported + constants + functions)
 
 
 @cache
@@ -95,9 +223,15 @@ def all_toplevel_imported_symbols(file_content: str) -> list[str]:
 
 
 @cache
+def _toplevel_imported_symbol_set(file_content: str) -> frozenset[str]:
+    """Set of `all_toplevel_imported_symbols`, for membership checks."""
+    return frozenset(all_toplevel_imported_symbols(file_content))
+
+
+@func_cache
 def all_function_imported_symbols(func_node: FuncAst) -> list[str]:
     """Symbols imported in the function's scope."""
-    return _get_imported_symbols(ast.walk(func_node))
+    return _get_imported_symbols(_walk(func_node))
 
 
 def _get_imported_symbols(nodes: Iterable[ast.AST]) -> list[str]:
@@ -105,8 +239,8 @@ def _get_imported_symbols(nodes: Iterable[ast.AST]) -> list[str]:
 
     def iterator() -> Iterator[str]:
         for node in nodes:
-            if isinstance(node, IMPORT_ASTS):
-                for n in node.names:
+            if type(node) in _IMPORT_TYPES:
+                for n in cast("ImportAst", node).names:
                     yield n.asname if n.asname is not None else n.name
 
     return list(iterator())
@@ -121,7 +255,7 @@ def all_function_names(file_content: str) -> list[str]:
 @cache
 def all_functions(file_content: str) -> list[Function]:
     """All functions defined in the file."""
-    return _functions_from_nodes(all_nodes(file_content))
+    return scan_functions_and_calls(file_content)[0]
 
 
 @cache
@@ -135,8 +269,8 @@ def _functions_from_nodes(nodes: Iterable[ast.AST]) -> list[Function]:
 
     def iterator() -> Iterator[Function]:
         for node in nodes:
-            if isinstance(node, FUNC_ASTS):
-                yield Function.from_node(node)
+            if type(node) in _FUNC_TYPES:
+                yield Function.from_node(cast("FuncAst", node))
 
     return list(iterator())
 
@@ -158,7 +292,7 @@ def all_global_assignments(file_content: str) -> list[ast.Assign]:
     """Global assignment nodes."""
 
     def iterator() -> Iterator[ast.Assign]:
-        for body_node in ast.parse(file_content).body:
+        for body_node in _parse(file_content).body:
             if isinstance(body_node, ast.Assign):
                 yield body_node
 
@@ -168,14 +302,14 @@ def all_global_assignments(file_content: str) -> list[ast.Assign]:
 @cache
 def all_toplevel_symbol_usages(file_content: str) -> dict[str, int]:
     """Number of times toplevel symbols are used in the file."""
-    return _toplevel_symbol_usages(file_content, all_nodes(file_content))
+    return _toplevel_symbol_usages(file_content, _nodes_of_type(file_content, ast.Name))
 
 
 @cache
 def all_nontype_toplevel_symbol_usages(file_content: str) -> dict[str, int]:
     """Number of times toplevel symbols are used outside of type hints."""
     return _toplevel_symbol_usages(
-        file_content, ast.walk(remove_type_annotation(ast.parse(file_content)))
+        file_content, _nodes_outside_type_annotations(file_content, ast.Name)
     )
 
 
@@ -185,66 +319,170 @@ def _toplevel_symbol_usages(
     """Numbers of usages of global/toplevel symbols in given nodes."""
     toplevel_symbols = all_global_symbols(file_content)
 
-    used_symbols: dict[str, int] = defaultdict(int)
-    for node in nodes:
-        if _is_symbol_usage(node):
-            if node.id in toplevel_symbols:
-                used_symbols[node.id] += 1
-
-    return used_symbols
+    # Counter does the counting itself in C (`_count_elements`)
+    return Counter(
+        node.id
+        for node in nodes
+        if type(node) is ast.Name
+        and type(node.ctx) is ast.Load
+        and node.id in toplevel_symbols
+    )
 
 
 @cache
 def all_type_hint_usages(file_content: str) -> dict[str, int]:
     """Get the numbers of times symbols are used as type-hints."""
-    type_hint_symbols: dict[str, int] = defaultdict(int)
+    return Counter(
+        name
+        for type_node in _type_annotation_roots(file_content)
+        for name in _get_all_names_in_node(type_node)
+    )
 
-    def _add_symbols_from_type_node(type_node: ast.AST) -> None:
-        for name in _get_all_names_in_node(type_node):
-            type_hint_symbols[name] += 1
 
-    for node in all_nodes(file_content):
-        # Function arguments and variable annotations
-        if isinstance(node, (ast.arg, ast.AnnAssign)) and node.annotation is not None:
-            _add_symbols_from_type_node(node.annotation)
-        # Function return values
-        elif isinstance(node, FUNC_ASTS) and node.returns is not None:
-            _add_symbols_from_type_node(node.returns)
+@cache
+def _type_annotation_roots(file_content: str) -> list[ast.AST]:
+    """Root nodes of all type annotations in the file."""
+    return _type_annotation_roots_in(_node_index(file_content))
+
+
+def _type_annotation_roots_in(
+    index: dict[Type[ast.AST], list[ast.AST]],
+) -> list[ast.AST]:
+    """Root nodes of all type annotations in the node index."""
+    roots: list[ast.AST] = []
+    # Function arguments
+    for arg in cast("list[ast.arg]", index.get(ast.arg, [])):
+        if arg.annotation is not None:
+            roots.append(arg.annotation)
+    # Variable annotations
+    for ann_assign in cast("list[ast.AnnAssign]", index.get(ast.AnnAssign, [])):
+        roots.append(ann_assign.annotation)
+    # Function return values
+    for func_node in _function_nodes_in(index):
+        if func_node.returns is not None:
+            roots.append(func_node.returns)
+    return roots
 
-    return type_hint_symbols
+
+@cache
+def _node_index_outside_type_annotations(
+    file_content: str,
+) -> dict[Type[ast.AST], list[ast.AST]]:
+    """Like `_node_index`, but without the nodes lying inside type annotations.
+
+    Filters the by-type node index, so the whole tree is not walked again.
+    The annotations are taken from the very same index, so that the node
+    identities always refer to one tree, whatever other caches were evicted.
+    """
+    index = _node_index(file_content)
+    annotation_ids = {
+        id(node) for root in _type_annotation_roots_in(index) for node in _walk(root)
+    }
+    return {
+        node_type: [node for node in nodes if id(node) not in annotation_ids]
+        for node_type, nodes in index.items()
+    }
+
+
+def _nodes_outside_type_annotations(
+    file_content: str, node_type: Type[NodeT]
+) -> list[NodeT]:
+    """Nodes of given type that are not part of any type annotation."""
+    index = _node_index_outside_type_annotations(file_content)
+    return cast("list[NodeT]", index.get(node_type, []))
 
 
 @cache
 def all_nodes_outside_of_function(file_content: str) -> list[ast.AST]:
     """Get all nodes outside of any function."""
-    return list(_filter_parent_nodes(ast.parse(file_content), IMPORT_ASTS + FUNC_ASTS))
+    return list(_filter_parent_nodes(_parse(file_content), _IMPORT_TYPES | _FUNC_TYPES))
 
 
 def _filter_parent_nodes(
-    node: ast.AST, filter_types: tuple[Type[ast.AST], ...]
+    node: ast.AST, filter_types: frozenset[Type[ast.AST]]
 ) -> Iterator[ast.AST]:
     """Get all nodes that are not children of some types or the types itself.
 
     Not including module itself.
+    Goes through the tree depth-first (each node before its children),
+    with an explicit stack instead of recursion.
     """
-    if isinstance(node, filter_types):
-        return
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if type(node) in filter_types:
+            continue
 
-    if not isinstance(node, ast.Module):
-        yield node
+        if type(node) is not ast.Module:
+            yield node
 
-    for child in ast.iter_child_nodes(node):
-        yield from _filter_parent_nodes(child, filter_types)
+        # Reversed, so that the children are popped in their original order
+        stack.extend(reversed(_child_nodes(node)))
 
 
 def get_method_names(node: ast.ClassDef) -> list[str]:
     """Names of all methods defined in the class."""
-    return [n.name for n in node.body if isinstance(n, FUNC_ASTS)]
+    return [cast("FuncAst", n).name for n in node.body if type(n) in _FUNC_TYPES]
+
+
+def has_only_method(node: ast.ClassDef, method_name: str) -> bool:
+    """Check if the class defines exactly one method, with the given name.
+
+    Stops at the first method that does not fit, without listing all of them.
+    """
+    found = False
+    for n in node.body:
+        if type(n) in _FUNC_TYPES:
+            if found or cast("FuncAst", n).name != method_name:
+                return False
+            found = True
+    return found
 
 
 def get_node_code(file_content: str, node: ast.AST) -> str:
-    """Literal python code of the given node."""
-    return str(ast.get_source_segment(file_content, node))
+    """Literal python code of the given node.
+
+    Same as `ast.get_source_segment`, but the file is split into lines
+    only once, not on every call.
+    """
+    code = get_node_code_bytes(file_content, node)
+    if code is None:
+        return str(None)
+    return str(code, "utf-8")
+
+
+def get_node_code_bytes(file_content: str, node: ast.AST) -> memoryview | None:
+    """UTF-8 encoded python code of the given node, None when it has no position.
+
+    A view into the cached encoded file, so that e.g. hashing or comparing
+    the code of many nodes does not copy or decode anything.
+    """
+    lineno: int | None = getattr(node, "lineno", None)
+    end_lineno: int | None = getattr(node, "end_lineno", None)
+    col_offset: int | None = getattr(node, "col_offset", None)
+    end_col_offset: int | None = getattr(node, "end_col_offset", None)
+    if lineno is None or end_lineno is None:
+        return None
+    if col_offset is None or end_col_offset is None:
+        return None
+
+    # Column offsets are in UTF-8 bytes
+    encoded, line_offsets = _encoded_source(file_content)
+    start = line_offsets[lineno - 1] + col_offset
+    end = line_offsets[end_lineno - 1] + end_col_offset
+    return encoded[start:end]
+
+
+@cache
+def _encoded_source(file_content: str) -> tuple[memoryview, list[int]]:
+    """UTF-8 encoded file and the offsets where its lines start.
+
+    Lines are split the same way as `ast.get_source_segment` does.
+    """
+    # UTF-8 never encodes non-ASCII characters with line-break bytes
+    encoded = file_content.encode()
+    lines = encoded.splitlines(keepends=True)
+    return memoryview(encoded), list(accumulate(map(len, lines), initial=0))
 
 
 def get_node_str(node: ast.AST) -> str:  # pragma: no cover
@@ -264,15 +502,16 @@ def print_node_code(file_content: str, node: ast.AST) -> None:  # pragma: no cov
 
 def print_ast(file_content: str) -> None:  # pragma: no cover
     """Print the whole AST of the file."""
-    print_node(ast.parse(file_content))
+    print_node(_parse(file_content))
 
 
 def get_function_name(node: ast.Call) -> str:
     """Name of the function called in the node."""
-    if isinstance(node.func, ast.Attribute):
-        return node.func.attr
-    elif isinstance(node.func, ast.Name):
-        return node.func.id
+    func = node.func
+    if type(func) is ast.Attribute:
+        return func.attr
+    elif type(func) is ast.Name:
+        return func.id
     else:
         return "Unknown function name"
 
@@ -290,15 +529,19 @@ def get_variable_name(node: ast.Assign) -> str:
     return node.targets[0].id  # type: ignore
 
 
+@cache
+def all_symbol_assignment_amounts(file_content: str) -> dict[str, int]:
+    """How many times each symbol is assigned in the file."""
+    return Counter(
+        node.id
+        for node in _nodes_of_type(file_content, ast.Name)
+        if type(node.ctx) is ast.Store
+    )
+
+
 def is_really_a_constant(file_content: str, var_name: str) -> bool:
     """Check if the variable is defined only once."""
-    assigned_num = 0
-    for node in all_nodes(file_content):
-        if _is_symbol_assignment(node):
-            if node.id == var_name:
-                assigned_num += 1
-
-    return assigned_num == 1
+    return all_symbol_assignment_amounts(file_content).get(var_name) == 1
 
 
 def is_a_constant_number_var(file_content: str, assign: ast.Assign) -> bool:
@@ -314,12 +557,7 @@ def is_a_constant_number_var(file_content: str, assign: ast.Assign) -> bool:
 def _get_all_names_in_node(node: ast.AST) -> list[str]:
     """Get all names/symbols appearing in the node and its children."""
 
-    def iterator() -> Iterator[str]:
-        for child in ast.walk(node):
-            if isinstance(child, ast.Name):
-                yield child.id
-
-    return list(iterator())
+    return [child.id for child in _iter_nodes_of_type(node, ast.Name)]
 
 
 def is_used_outside_function(file_content: str, symbol: str) -> bool:
@@ -328,21 +566,28 @@ def is_used_outside_function(file_content: str, symbol: str) -> bool:
     Also looking for usages in the function's decorators and default arguments,
     as those places can only use global symbols.
     """
-    for node in all_nodes(file_content):
-        if isinstance(node, FUNC_ASTS):
-            for decorator in node.decorator_list:
-                if symbol in _get_all_names_in_node(decorator):
-                    return True
-            for default_value in node.args.defaults:
-                if symbol in _get_all_names_in_node(default_value):
-                    return True
+    return symbol in _symbols_used_outside_function(file_content)
+
+
+@cache
+def _symbols_used_outside_function(file_content: str) -> frozenset[str]:
+    """All symbols used outside of any function - see `is_used_outside_function`.
+
+    Computed once for the file, as it is asked for many symbols.
+    """
+    used_symbols: set[str] = set()
+
+    for func_node in _all_function_nodes(file_content):
+        for decorator in func_node.decorator_list:
+            used_symbols.update(_get_all_names_in_node(decorator))
+        for default_value in func_node.args.defaults:
+            used_symbols.update(_get_all_names_in_node(default_value))
 
     for node in all_nodes_outside_of_function(file_content):
-        if _is_symbol_usage(node):
-            if node.id == symbol:
-                return True
+        if type(node) is ast.Name and type(node.ctx) is ast.Load:
+            used_symbols.add(node.id)
 
-    return False
+    return frozenset(used_symbols)
 
 
 def is_used_as_type_hint(file_content: str, symbol: str) -> bool:
@@ -350,6 +595,8 @@ def is_used_as_type_hint(file_content: str, symbol: str) -> bool:
     return symbol in all_type_hint_usages(file_content)
 
 
+# Loops over many nodes inline these as `type(...) is ...` checks,
+# saving a function call per node (the parser never creates subclasses)
 def _is_symbol_assignment(node: ast.AST) -> TypeGuard[ast.Name]:
     """Whether the node is a symbol assignment."""
     return isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store)
@@ -360,37 +607,86 @@ def _is_symbol_usage(node: ast.AST) -> TypeGuard[ast.Name]:
     return isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)
 
 
+@func_cache
 def get_used_func_symbols(func_node: FuncAst) -> dict[str, int]:
     """How many times each symbol is being used in a function.
 
     Disregarding type hints.
     """
-    used_symbols: dict[str, int] = defaultdict(int)
+    return Counter(
+        node.id
+        for node in _iter_nodes_of_type(
+            func_node, ast.Name, _CHILD_FIELDS_WITHOUT_TYPE_ANNOTATIONS
+        )
+        if type(node.ctx) is ast.Load
+    )
 
-    for node in ast.walk(remove_type_annotation(func_node)):
-        if _is_symbol_usage(node):
-            used_symbols[node.id] += 1
 
-    return used_symbols
+def _function_position(node: FuncAst) -> tuple[int, int]:
+    """Line and column of the function definition."""
+    return node.lineno, node.col_offset
+
+
+@cache
+def all_function_symbols(
+    file_content: str,
+) -> dict[tuple[int, int], FunctionSymbols]:
+    """Symbols used and imported in each function of the file.
+
+    Gives the same results as `get_used_func_symbols` and
+    `all_function_imported_symbols` for every function, but gets
+    them all in one walk, attributing the nodes to all their enclosing
+    functions (nested functions count also for their parents).
+
+    Keyed by `Function.position`, not by the node, as the functions may come
+    from another cached helper, holding a different parse of the file.
+    """
+    function_symbols: dict[tuple[int, int], FunctionSymbols] = {}
+
+    todo: deque[tuple[ast.AST, tuple[FunctionSymbols, ...]]] = deque(
+        [(_parse(file_content), ())]
+    )
+    while todo:
+        node, enclosing = todo.popleft()
+        if type(node) is ast.Name and type(node.ctx) is ast.Load:
+            for symbols in enclosing:
+                symbols.usages[node.id] += 1
+        elif type(node) in _IMPORT_TYPES:
+            imported = _get_imported_symbols([node])
+            for symbols in enclosing:
+                symbols.imported.extend(imported)
+        elif type(node) in _FUNC_TYPES:
+            symbols = FunctionSymbols(defaultdict(int), [])
+            function_symbols[_function_position(cast("FuncAst", node))] = symbols
+            enclosing = (*enclosing, symbols)
+
+        for child in _child_nodes(node, _CHILD_FIELDS_WITHOUT_TYPE_ANNOTATIONS):
+            todo.append((child, enclosing))
+
+    return function_symbols
 
 
 def get_used_func_import_symbols(
     file_content: str, func_node: FuncAst
 ) -> dict[str, int]:
-    toplevel_symbols = all_toplevel_imported_symbols(file_content)
+    toplevel_symbols = _toplevel_imported_symbol_set(file_content)
     used_symbols = get_used_func_symbols(func_node)
     return {k: v for k, v in used_symbols.items() if k in toplevel_symbols}
 
 
+@cache
 def get_toplevel_symbol_usages_in_functions(
     file_content: str,
 ) -> dict[str, list[SymbolUsageInFunction]]:
     symbol_usages: dict[str, list[SymbolUsageInFunction]] = defaultdict(list)
 
+    toplevel_symbols = _toplevel_imported_symbol_set(file_content)
+    function_symbols = all_function_symbols(file_content)
+
     for func in all_functions(file_content):
-        usages = get_used_func_import_symbols(file_content, func.node)
-        for symbol, usage_num in usages.items():
-            symbol_usages[symbol].append(SymbolUsageInFunction(func, usage_num))
+        for symbol, usage_num in function_symbols[func.position].usages.items():
+            if symbol in toplevel_symbols:
+                symbol_usages[symbol].append(SymbolUsageInFunction(func, usage_num))
 
     return symbol_usages
 
@@ -402,14 +698,132 @@ def get_function_call_amounts(
 
     Does not currently consider methods on objects.
     """
-    function_calls: dict[str, int] = defaultdict(int)
+    return scan_functions_and_calls(file_content)[1]
 
-    for node in all_nodes(file_content):
-        if isinstance(node, ast.Call):
-            if _is_symbol_usage(node.func):
-                function_calls[node.func.id] += 1
 
-    return function_calls
+@cache
+def scan_functions_and_calls(
+    file_content: str,
+) -> tuple[list[Function], dict[str, int]]:
+    """All functions defined in the file and amounts of function calls.
+
+    Both are taken from the node index, as they are often needed together.
+    """
+    functions = [Function.from_node(n) for n in _all_function_nodes(file_content)]
+
+    function_calls = Counter(
+        node.func.id
+        for node in _nodes_of_type(file_content, ast.Call)
+        if type(node.func) is ast.Name and type(node.func.ctx) is ast.Load
+    )
+
+    return functions, function_calls
+
+
+# Field name and whether it holds a list (None when not known)
+_ChildField: TypeAlias = "tuple[str, bool | None]"
+
+# Builtin ASDL types, whose fields never hold AST nodes
+_ASDL_SCALAR_TYPES = frozenset({"identifier", "string", "int", "constant"})
+# Node class signature, as in `ast.Return.__doc__` == "Return(expr? value)"
+_ASDL_SIGNATURE = re.compile(r"(\w+)\((.*)\)")
+
+
+def _node_child_fields(node_type: Type[ast.AST]) -> tuple[_ChildField, ...]:
+    """Fields of the node type that can hold child nodes.
+
+    Read from the ASDL signature in the class docstring, so that fields
+    with identifiers, strings and constants are not even looked at
+    when walking the tree. When the signature is not understood,
+    all the fields are kept, with their kind not known.
+    """
+    match = _ASDL_SIGNATURE.fullmatch(node_type.__doc__ or "")
+    if match is None or match.group(1) != node_type.__name__:
+        return tuple((name, None) for name in node_type._fields)
+
+    typed_fields = [field.split() for field in match.group(2).split(", ")]
+    if [name for _, name in typed_fields] != list(node_type._fields):
+        return tuple((name, None) for name in node_type._fields)
+
+    return tuple(
+        (name, asdl_type.endswith("*"))
+        for asdl_type, name in typed_fields
+        if asdl_type.rstrip("*?") not in _ASDL_SCALAR_TYPES
+    )
+
+
+class _ChildFieldsTable(dict[Type[ast.AST], tuple[_ChildField, ...]]):
+    """Child node fields of each node type, classified on the first use."""
+
+    def __init__(self, skipped_fields: tuple[str, ...] = ()) -> None:
+        super().__init__()
+        self.skipped_fields = skipped_fields
+
+    def __missing__(self, node_type: Type[ast.AST]) -> tuple[_ChildField, ...]:
+        fields = tuple(
+            field
+            for field in _node_child_fields(node_type)
+            if field[0] not in self.skipped_fields
+        )
+        self[node_type] = fields
+        return fields
+
+
+_CHILD_FIELDS = _ChildFieldsTable()
+_CHILD_FIELDS_WITHOUT_TYPE_ANNOTATIONS = _ChildFieldsTable(_TYPE_ANNOTATION_FIELDS)
+
+
+def _child_nodes(
+    node: ast.AST, fields_table: _ChildFieldsTable = _CHILD_FIELDS
+) -> list[ast.AST]:
+    """Like `ast.iter_child_nodes` (the same nodes in the same order), but faster.
+
+    Only the fields that can hold nodes are looked at, without checking
+    the type of every value.
+    """
+    children: list[ast.AST] = []
+    for name, is_list in fields_table[type(node)]:
+        value = getattr(node, name, None)
+        if value is None:
+            continue
+        if is_list:
+            # `Dict.keys` has None for `**` unpacking
+            if None in value:
+                children.extend([item for item in value if item is not None])
+            else:
+                children.extend(value)
+        elif is_list is not None:
+            children.append(value)
+        elif isinstance(value, ast.AST):
+            children.append(value)
+        elif isinstance(value, list):
+            children.extend([item for item in value if isinstance(item, ast.AST)])
+    return children
+
+
+def _walk(
+    root: ast.AST, fields_table: _ChildFieldsTable = _CHILD_FIELDS
+) -> Iterator[ast.AST]:
+    """Like `ast.walk` (the same nodes in the same order), using `_child_nodes`."""
+    todo = deque([root])
+    while todo:
+        node = todo.popleft()
+        todo.extend(_child_nodes(node, fields_table))
+        yield node
+
+
+def _iter_nodes_of_type(
+    root: ast.AST,
+    node_type: Type[NodeT],
+    fields_table: _ChildFieldsTable = _CHILD_FIELDS,
+) -> Iterator[NodeT]:
+    """Nodes of the given type under the root (included), in the order of `ast.walk`."""
+    todo = deque([root])
+    while todo:
+        node = todo.popleft()
+        todo.extend(_child_nodes(node, fields_table))
+        if type(node) is node_type:
+            yield node
 
 
 def remove_type_annotation(
@@ -419,90 +833,155 @@ def remove_type_annotation(
 
     Returns a new tree, without changing the original one.
     """
-    copied_root = deepcopy(root)
+    return _copy_without_type_annotations(root)
 
-    for node in ast.walk(copied_root):
-        if hasattr(node, "annotation"):
-            node.annotation = None  # type: ignore
-        elif hasattr(node, "returns"):
-            node.returns = None  # type: ignore
 
-    return copied_root
+def _copy_without_type_annotations(node: NodeT) -> NodeT:
+    """Deep copy of the node, with its annotation fields set to None.
 
+    Only nodes and lists are copied, the other values (identifiers,
+    constants) are immutable and can be shared. Annotation subtrees
+    are not copied at all, unlike with `copy.deepcopy` and removing
+    them afterwards.
+    """
+    node_type = type(node)
+    copied = node_type.__new__(node_type)
+    copied.__dict__.update(
+        (name, None if name in _TYPE_ANNOTATION_FIELDS else _copy_value(value))
+        for name, value in node.__dict__.items()
+    )
+    return copied
+
+
+def _copy_value(value: T) -> T:
+    """Copy of a field value, not going into type annotations."""
+    if isinstance(value, ast.AST):
+        return _copy_without_type_annotations(value)
+    if isinstance(value, list):
+        return cast(T, [_copy_value(item) for item in value])
+    return value
 
+
+@cache
 def get_global_attribute_lookups(
-    file_content: str, include_type_hints: bool = False
+    file_content: str, include_type_hints: bool = False, min_count: int = 1
 ) -> dict[str, dict[str, int]]:
-    """Numbers of global symbol attribute lookups."""
-    root = ast.parse(file_content)
-    if not include_type_hints:
-        nodes = ast.walk(remove_type_annotation(root))
+    """Numbers of global symbol attribute lookups.
+
+    Only lookups happening at least `min_count` times are included.
+    """
+    if include_type_hints:
+        nodes = _nodes_of_type(file_content, ast.Attribute)
     else:
-        nodes = ast.walk(root)
-    return _get_attribute_lookups(file_content, nodes, is_local=False)
+        nodes = _nodes_outside_type_annotations(file_content, ast.Attribute)
+    return _filter_lookups(_get_attribute_lookups(file_content, nodes), min_count)
 
 
+@func_cache
 def get_func_local_attribute_lookups(
-    file_content: str, func_node: FuncAst
+    file_content: str, func_node: FuncAst, min_count: int = 1
 ) -> dict[str, dict[str, int]]:
-    """Numbers of local symbol attribute lookups in a given function node."""
-    return _get_attribute_lookups(file_content, ast.walk(func_node), is_local=True)
+    """Numbers of local symbol attribute lookups in a given function node.
+
+    Only lookups happening at least `min_count` times are included.
+    """
+    all_imported_symbols = _toplevel_imported_symbol_set(file_content)
+    local_lookups = {
+        obj_name: attrs
+        for obj_name, attrs in scan_function(func_node).attr_lookups.items()
+        if obj_name not in all_imported_symbols
+    }
+    return _filter_lookups(local_lookups, min_count)
 
 
 def _get_attribute_lookups(
-    file_content: str, nodes: Iterable[ast.AST], is_local: bool
+    file_content: str, nodes: Iterable[ast.Attribute]
 ) -> dict[str, dict[str, int]]:
-    """How many times a certain attribute was accessed on certain object in given nodes.
+    """How many times a certain attribute was accessed on certain global object in given attribute nodes."""
+    lookups: dict[str, dict[str, int]] = {}
 
-    `is_local` is deciding whether to look for local or global symbol's lookups.
+    all_imported_symbols = _toplevel_imported_symbol_set(file_content)
+
+    for node in nodes:
+        if type(node.value) is ast.Name:
+            if node.value.id in all_imported_symbols:
+                _add_lookup(lookups, node.value.id, node.attr)
+
+    return lookups
+
+
+def _add_lookup(lookups: dict[str, dict[str, int]], obj_name: str, attr: str) -> None:
+    """Count one lookup of `attr` on `obj_name`.
+
+    Plain dicts are cheaper here than nested defaultdicts,
+    whose factories are Python-level calls on every miss.
     """
-    lookups: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    attrs = lookups.get(obj_name)
+    if attrs is None:
+        attrs = lookups[obj_name] = {}
+    attrs[attr] = attrs.get(attr, 0) + 1
 
-    all_imported_symbols = all_toplevel_imported_symbols(file_content)
 
-    def _include_lookup(node: ast.Name) -> bool:
-        if is_local:
-            return node.id not in all_imported_symbols
-        else:
-            return node.id in all_imported_symbols
+def _filter_lookups(
+    lookups: dict[str, dict[str, int]], min_count: int
+) -> dict[str, dict[str, int]]:
+    """Leave out the attribute lookups happening less than `min_count` times.
 
-    for node in nodes:
-        if isinstance(node, ast.Attribute):
-            if isinstance(node.value, ast.Name):
-                if _include_lookup(node.value):
-                    lookups[node.value.id][node.attr] += 1
+    Objects without any remaining lookups are left out as well.
+    """
+    if min_count <= 1:
+        return lookups
 
-    return lookups
+    filtered: dict[str, dict[str, int]] = {}
+    for obj_name, attrs in lookups.items():
+        frequent = {
+            attr: amount for attr, amount in attrs.items() if amount >= min_count
+        }
+        if frequent:
+            filtered[obj_name] = frequent
 
+    return filtered
 
-def is_attr_modified(func_node: FuncAst, obj_name: str, attr_name: str) -> bool:
-    """Check if the given attribute of the given object is modified in the function."""
 
-    def _target_is_ours(node: ast.AST) -> bool:
-        if isinstance(node, ast.Attribute):
-            if isinstance(node.value, ast.Name):
-                if node.value.id == obj_name and node.attr == attr_name:
-                    return True
+@func_cache
+def scan_function(func_node: FuncAst) -> FunctionStats:
+    """Attribute lookups, modified attributes and assigned symbols in the function.
 
-        return False
+    Everything is collected in one walk, so that strategies needing
+    more of these do not walk the function repeatedly.
+    """
+    stats = FunctionStats(
+        attr_lookups={},
+        modified_attrs=set(),
+        assigned_symbols=set(),
+    )
 
-    for node in ast.walk(func_node):
-        if isinstance(node, ast.Assign):
+    def _add_modified_attr(target: ast.AST) -> None:
+        if isinstance(target, ast.Attribute):
+            if isinstance(target.value, ast.Name):
+                stats.modified_attrs.add((target.value.id, target.attr))
+
+    for node in _walk(func_node):
+        if type(node) is ast.Attribute:
+            if type(node.value) is ast.Name:
+                _add_lookup(stats.attr_lookups, node.value.id, node.attr)
+        elif type(node) is ast.Name:
+            if type(node.ctx) is ast.Store:
+                stats.assigned_symbols.add(node.id)
+        elif type(node) is ast.Assign:
             for target in node.targets:
-                if _target_is_ours(target):
-                    return True
-        elif isinstance(node, ast.AugAssign):
-            if _target_is_ours(node.target):
-                return True
+                _add_modified_attr(target)
+        elif type(node) is ast.AugAssign:
+            _add_modified_attr(node.target)
 
-    return False
+    return stats
+
+
+def is_attr_modified(func_node: FuncAst, obj_name: str, attr_name: str) -> bool:
+    """Check if the given attribute of the given object is modified in the function."""
+    return (obj_name, attr_name) in scan_function(func_node).modified_attrs
 
 
 def is_symbol_assigned(func_node: FuncAst, symbol: str) -> bool:
     """Check if the given symbol is assigned in the function."""
-    for node in ast.walk(func_node):
-        if _is_symbol_assignment(node):
-            if node.id == symbol:
-                return True
-
-    return False
+    return symbol in scan_function(func_node).assigned_symbols
@@ -3,11 +3,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Iterator
 
-from . import Settings, SpaceSaving
+from . import SLOTS, Settings, SpaceSaving
 from .helpers import CacheCandidate, get_global_attribute_lookups
 
 
-@dataclass
+@dataclass(**SLOTS)
 class GlobalImportCache(SpaceSaving):
     cache_candidate: CacheCandidate
 
@@ -27,9 +27,9 @@ def global_import_cache(
     """
 
     def iterator() -> Iterator[GlobalImportCache]:
-        for symbol, lookups in get_global_attribute_lookups(file_content).items():
-            for attr, amount in lookups.items():
-                if amount >= threshold:
-                    yield GlobalImportCache(CacheCandidate(f"{symbol}.{attr}", amount))
+        lookups = get_global_attribute_lookups(file_content, min_count=threshold)
+        for symbol, attrs in lookups.items():
+            for attr, amount in attrs.items():
+                yield GlobalImportCache(CacheCandidate(symbol, amount, attr))
 
     return list(iterator())
@@ -3,7 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Iterator
 
-from . import Settings, SpaceSaving
+from . import SLOTS, Settings, SpaceSaving
 from .helpers import (
     Function,
     get_toplevel_symbol_usages_in_functions,
@@ -12,7 +12,7 @@ from .helpers import (
 )
 
 
-@dataclass
+@dataclass(**SLOTS)
 class OneFunctionImport(SpaceSaving):
     func: Function
     symbol: str
@@ -78,4 +78,4 @@ def one_function_import(
                 used_as_type_hint=is_used_as_type_hint(file_content, symbol),
             )
 
-    return sorted(list(iterator()), key=lambda x: x.func.line_no)
+    return sorted(iterator(), key=lambda x: x.func.line_no)
@@ -1,14 +1,13 @@
 from __future__ import annotations
 
-import ast
 from dataclasses import dataclass
 from typing import Iterator
 
-from . import Settings, SpaceSaving
-from .helpers import all_nodes, get_function_name
+from . import SLOTS, Settings, SpaceSaving
+from .helpers import all_call_nodes, get_function_name
 
 
-@dataclass
+@dataclass(**SLOTS)
 class Kwarg(SpaceSaving):
     name: str
     amount: int
@@ -34,13 +33,12 @@ def keyword_arguments(
     """
 
     def iterator() -> Iterator[Kwarg]:
-        for node in all_nodes(file_content):
-            if isinstance(node, ast.Call):
-                if node.keywords:
-                    yield Kwarg(
-                        name=get_function_name(node),
-                        amount=len(node.keywords),
-                        line_no=node.lineno,
-                    )
-
-    return sorted(list(iterator()), key=lambda x: x.line_no)
+        for node in all_call_nodes(file_content):
+            if node.keywords:
+                yield Kwarg(
+                    name=get_function_name(node),
+                    amount=len(node.keywords),
+                    line_no=node.lineno,
+                )
+
+    return sorted(iterator(), key=lambda x: x.line_no)
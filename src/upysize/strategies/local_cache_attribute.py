@@ -3,18 +3,17 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Iterator
 
-from . import Settings, SpaceSaving
+from . import SLOTS, Settings, SpaceSaving
 from .helpers import (
     CacheCandidate,
     Function,
     all_functions,
     get_func_local_attribute_lookups,
-    is_attr_modified,
-    is_symbol_assigned,
+    scan_function,
 )
 
 
-@dataclass
+@dataclass(**SLOTS)
 class LocalCache(SpaceSaving):
     cache_candidate: CacheCandidate
     func: Function
@@ -58,19 +57,18 @@ def local_cache_attribute(
 
     def iterator() -> Iterator[LocalCache]:
         for func in all_functions(file_content):
-            attr_lookups = get_func_local_attribute_lookups(file_content, func.node)
+            # All the needed info about the function is gathered in one walk
+            stats = scan_function(func.node)
+            attr_lookups = get_func_local_attribute_lookups(
+                file_content, func.node, min_count=threshold
+            )
             for obj_name, attrs in attr_lookups.items():
                 for attr_name, amount in attrs.items():
-                    if amount >= threshold:
-                        yield LocalCache(
-                            cache_candidate=CacheCandidate(
-                                f"{obj_name}.{attr_name}", amount
-                            ),
-                            func=func,
-                            attribute_mutated=is_attr_modified(
-                                func.node, obj_name, attr_name
-                            ),
-                            symbol_assigned=is_symbol_assigned(func.node, obj_name),
-                        )
+                    yield LocalCache(
+                        cache_candidate=CacheCandidate(obj_name, amount, attr_name),
+                        func=func,
+                        attribute_mutated=(obj_name, attr_name) in stats.modified_attrs,
+                        symbol_assigned=obj_name in stats.assigned_symbols,
+                    )
 
-    return sorted(list(iterator()), key=lambda x: x.func.line_no)
+    return sorted(iterator(), key=lambda x: x.func.line_no)
@@ -3,18 +3,17 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Iterator
 
-from . import Settings, SpaceSaving
+from . import SLOTS, Settings, SpaceSaving
 from .helpers import (
     CacheCandidate,
     Function,
-    all_function_imported_symbols,
+    all_function_symbols,
     all_functions,
     all_global_symbols,
-    get_used_func_symbols,
 )
 
 
-@dataclass
+@dataclass(**SLOTS)
 class LocalCacheGlobal(SpaceSaving):
     cache_candidate: CacheCandidate
     func: Function
@@ -50,14 +49,15 @@ def local_cache_global(
 
     def iterator() -> Iterator[LocalCacheGlobal]:
         global_symbols = all_global_symbols(file_content)
+        function_symbols = all_function_symbols(file_content)
 
         for func in all_functions(file_content):
-            imported_in_func = all_function_imported_symbols(func.node)
-            used_in_func = get_used_func_symbols(func.node)
+            imported_in_func = function_symbols[func.position].imported
+            used_in_func = function_symbols[func.position].usages
             for symbol in used_in_func:
                 if symbol in global_symbols and symbol not in imported_in_func:
                     amount = used_in_func[symbol]
                     if amount >= threshold:
                         yield LocalCacheGlobal(CacheCandidate(symbol, amount), func)
 
-    return sorted(list(iterator()), key=lambda x: x.func.line_no)
+    return sorted(iterator(), key=lambda x: x.func.line_no)
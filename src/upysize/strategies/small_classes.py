@@ -4,11 +4,11 @@ import ast
 from dataclasses import dataclass
 from typing import Iterator
 
-from . import Settings, SpaceSaving
-from .helpers import all_toplevel_nodes, get_method_names
+from . import SLOTS, Settings, SpaceSaving
+from .helpers import all_toplevel_nodes, has_only_method
 
 
-@dataclass
+@dataclass(**SLOTS)
 class InitOnlyClass(SpaceSaving):
     name: str
     line_no: int
@@ -32,8 +32,8 @@ def init_only_classes(
 
     def iterator() -> Iterator[InitOnlyClass]:
         for node in all_toplevel_nodes(file_content):
-            if isinstance(node, ast.ClassDef):
-                if get_method_names(node) == ["__init__"]:
+            if type(node) is ast.ClassDef:
+                if has_only_method(node, "__init__"):
                     yield InitOnlyClass(node.name, node.lineno)
 
-    return sorted(list(iterator()), key=lambda x: x.line_no)
+    return sorted(iterator(), key=lambda x: x.line_no)
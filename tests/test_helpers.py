@@ -1,30 +1,44 @@
 import ast
+import sys
 from typing import Type
 
+import pytest
+
 from src.upysize.strategies.helpers import (
+    all_call_nodes,
+    all_function_imported_symbols,
+    all_function_symbols,
     all_functions,
+    all_global_assignments,
     all_global_symbols,
     all_nodes_outside_of_function,
+    all_nodes,
     all_nontype_toplevel_symbol_usages,
+    all_symbol_assignment_amounts,
     all_toplevel_functions,
     all_toplevel_imported_symbols,
     all_toplevel_nodes,
     all_toplevel_symbol_usages,
     all_type_hint_usages,
+    clear_caches,
     get_func_local_attribute_lookups,
     get_function_call_amounts,
     get_function_name,
     get_global_attribute_lookups,
     get_node_code,
+    get_node_code_bytes,
     get_used_func_import_symbols,
     get_used_func_symbols,
+    get_toplevel_symbol_usages_in_functions,
     get_variable_name,
+    has_only_method,
     is_attr_modified,
     is_really_a_constant,
     is_symbol_assigned,
     is_used_as_type_hint,
     is_used_outside_function,
     remove_type_annotation,
+    scan_function,
 )
 
 CODE = """\
@@ -105,6 +119,31 @@ def abc(x: ENUM):
     )
 
 
+def test_get_node_code_non_ascii():
+    code = 'x = "ščř"; y = (1,\r\n  "é")\n'
+    toplevel_nodes = all_toplevel_nodes(code)
+    assert get_node_code(code, toplevel_nodes[1]) == 'y = (1,\r\n  "é")'
+    for node in all_nodes(code):
+        assert get_node_code(code, node) == str(ast.get_source_segment(code, node))
+
+
+def test_get_node_code_bytes():
+    code = 'x = "ščř"\n'
+    toplevel_nodes = all_toplevel_nodes(code)
+    code_bytes = get_node_code_bytes(code, toplevel_nodes[0])
+    assert isinstance(code_bytes, memoryview)
+    assert code_bytes == 'x = "ščř"'.encode()
+    assert get_node_code_bytes(code, ast.Load()) is None
+
+
+def test_helpers_share_parsed_tree():
+    toplevel_nodes = all_toplevel_nodes(CODE)
+    node_ids = {id(node) for node in all_nodes(CODE)}
+    assert all(id(node) in node_ids for node in toplevel_nodes)
+    assert all_global_assignments(CODE)[0] is toplevel_nodes[6]
+    assert all_functions(CODE)[0].node is toplevel_nodes[-2]
+
+
 CODE2 = """\
 from micropython import const
 from messages import MessageType1, MessageType2
@@ -144,6 +183,45 @@ def test_get_used_func_symbols():
     }
 
 
+def test_all_function_imported_symbols():
+    code = """\
+import messages
+
+def main(msg):
+    from writer import write_int
+    import enum as e
+    write_int(e.ABC)
+
+def abc(x: int):
+    return messages.MessageType2(x)
+"""
+    funcs = all_functions(code)
+    assert all_function_imported_symbols(funcs[0].node) == ["write_int", "e"]
+    assert all_function_imported_symbols(funcs[1].node) == []
+
+
+def test_all_function_symbols():
+    for code in (CODE2, CODE7, CODE8):
+        function_symbols = all_function_symbols(code)
+        for func in all_functions(code):
+            symbols = function_symbols[func.position]
+            assert symbols.usages == get_used_func_symbols(func.node)
+            assert symbols.imported == all_function_imported_symbols(func.node)
+
+
+def test_all_function_symbols_after_cache_eviction():
+    clear_caches()
+    functions = all_functions(CODE2)
+    # Parsing other files evicts the tree of CODE2, so it gets parsed again
+    for i in range(4):
+        all_toplevel_nodes(f"x = {i}")
+    function_symbols = all_function_symbols(CODE2)
+    for func in functions:
+        symbols = function_symbols[func.position]
+        assert symbols.usages == get_used_func_symbols(func.node)
+    assert get_toplevel_symbol_usages_in_functions(CODE2)
+
+
 def test_get_used_func_import_symbols():
     toplevel_nodes = all_toplevel_nodes(CODE2)
     func_node = toplevel_nodes[-1]
@@ -196,6 +274,15 @@ def test_is_really_a_constant():
     assert is_really_a_constant(CODE3, "HASH_LENGTH")
     assert not is_really_a_constant(CODE3, "counter")
     assert not is_really_a_constant(CODE3, "_ABC")
+    assert not is_really_a_constant(CODE3, "nonexistent")
+
+
+def test_all_symbol_assignment_amounts():
+    assert all_symbol_assignment_amounts(CODE3) == {
+        "HASH_LENGTH": 1,
+        "_ABC": 2,
+        "counter": 2,
+    }
 
 
 CODE4 = """\
@@ -238,6 +325,13 @@ def test_get_global_attribute_lookups():
         },
     }
 
+    lookups = get_global_attribute_lookups(CODE4, min_count=2)
+    assert lookups == {
+        "messages": {
+            "MessageType2": 3,
+        },
+    }
+
 
 CODE5 = """\
 from typing import TYPE_CHECKING
@@ -276,6 +370,18 @@ def test_all_type_hint_usages():
     }
 
 
+def test_nontype_symbol_usages_after_cache_eviction():
+    code = "from typing import Foo\ndef abc(x: Foo) -> Foo: ..."
+    clear_caches()
+    assert all_type_hint_usages(code) == {"Foo": 2}
+    # Indexing other files evicts the node index of the code, but not the
+    # annotations collected above
+    for i in range(4):
+        all_call_nodes(f"x = {i}")
+    assert all_nontype_toplevel_symbol_usages(code) == {}
+    assert get_global_attribute_lookups(code) == {}
+
+
 def test_is_used_as_type_hint():
     assert is_used_as_type_hint(CODE5, "Enum1")
     assert is_used_as_type_hint(CODE5, "Enum2")
@@ -318,6 +424,13 @@ def test_get_func_local_attribute_lookups():
         },
     }
 
+    lookups = get_func_local_attribute_lookups(CODE6, func_node, min_count=3)
+    assert lookups == {
+        "msg": {
+            "abc": 5,
+        },
+    }
+
 
 def test_attr_gets_modified():
     toplevel_nodes = all_toplevel_nodes(CODE6)
@@ -327,6 +440,27 @@ def test_attr_gets_modified():
     assert is_attr_modified(func_node, "msg", "xyz") is False
 
 
+def test_scan_function():
+    toplevel_nodes = all_toplevel_nodes(CODE6)
+    func_node = toplevel_nodes[-1]
+    assert isinstance(func_node, ast.FunctionDef)
+    stats = scan_function(func_node)
+    assert stats.attr_lookups == {
+        "msg": {
+            "abc": 5,
+            "xyz": 1,
+        },
+        "new_list": {
+            "append": 2,
+        },
+        "messages": {
+            "MyMessage": 2,
+        },
+    }
+    assert stats.modified_attrs == {("msg", "abc")}
+    assert stats.assigned_symbols == {"new_list", "x", "y"}
+
+
 CODE7 = """\
 import messages, utils, abc, paths
 from messages import MSG1, default_msg
@@ -436,6 +570,40 @@ def test_remove_type_annotation():
     modified_tree = remove_type_annotation(original_tree)
     assert _get_tree_size(original_tree) > _get_tree_size(modified_tree)
     assert _get_tree_size(original_tree) == orig_size
+    for node in ast.walk(modified_tree):
+        assert getattr(node, "annotation", None) is None
+        assert getattr(node, "returns", None) is None
+    original_ids = {id(node) for node in ast.walk(original_tree)}
+    assert all(id(node) not in original_ids for node in ast.walk(modified_tree))
+
+
+def _assert_all_nodes_same_as_ast_walk(source: str) -> None:
+    walked = all_nodes(source)
+    expected = list(ast.walk(ast.parse(source)))
+    assert [type(node) for node in walked] == [type(node) for node in expected]
+    assert [ast.dump(node) for node in walked] == [ast.dump(node) for node in expected]
+
+
+def test_all_nodes_same_as_ast_walk():
+    code = """\
+global counter
+data = {**defaults, "a": [1, *rest]}
+print(f"{data!r:>{width}}")
+"""
+    for source in (code, CODE, CODE5, CODE8):
+        _assert_all_nodes_same_as_ast_walk(source)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="match needs Python 3.10")
+def test_all_nodes_same_as_ast_walk_match():
+    code = """\
+match data:
+    case {"a": 1, **others}:
+        pass
+    case Point(x=0, y=y) | None:
+        pass
+"""
+    _assert_all_nodes_same_as_ast_walk(code)
 
 
 def test_all_functions():
@@ -486,3 +654,39 @@ def abc(ctx, msg):
     assert is_symbol_assigned(func_node, "res")
     assert is_symbol_assigned(func_node, "msg")
     assert not is_symbol_assigned(func_node, "ctx")
+
+
+def test_clear_caches():
+    funcs = all_functions(CODE8)
+    assert all_functions(CODE8) is funcs
+    clear_caches()
+    assert all_functions(CODE8) is not funcs
+    assert [f.name for f in all_functions(CODE8)] == [f.name for f in funcs]
+
+
+def test_has_only_method():
+    toplevel_nodes = all_toplevel_nodes(
+        """\
+class A:
+    x = 1
+    def __init__(self):
+        pass
+
+class B:
+    def __init__(self):
+        pass
+    def show(self):
+        pass
+
+class C:
+    x = 1
+"""
+    )
+    a, b, c = toplevel_nodes
+    assert isinstance(a, ast.ClassDef)
+    assert isinstance(b, ast.ClassDef)
+    assert isinstance(c, ast.ClassDef)
+    assert has_only_method(a, "__init__")
+    assert not has_only_method(a, "show")
+    assert not has_only_method(b, "__init__")
+    assert not has_only_method(c, "__init__")
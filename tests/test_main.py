@@ -0,0 +1,124 @@
+import multiprocessing as mp
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+import src.upysize.__main__ as upysize_main
+from src.upysize.__main__ import (
+    PathSuffixIndex,
+    ResultCache,
+    UserOptions,
+    analyze_files,
+)
+from src.upysize.analysis import analyze_file, get_file_results
+
+CODE = """\
+import messages
+
+def abc(x):
+    return messages.ABC + messages.ABC + messages.ABC
+"""
+
+
+def test_analyze_file_not_in_main():
+    # Processes started by "spawn" or "forkserver" do not import
+    # the `__main__` of a package run by `python -m`
+    assert not analyze_file.__module__.endswith("__main__")
+
+
+def test_analyze_files_spawn(tmp_path, monkeypatch):
+    files = []
+    for i in range(3):
+        file_path = tmp_path / f"file{i}.py"
+        file_path.write_text(CODE)
+        files.append(file_path)
+
+    spawn_executor = partial(ProcessPoolExecutor, mp_context=mp.get_context("spawn"))
+    monkeypatch.setattr(upysize_main, "ProcessPoolExecutor", spawn_executor)
+
+    cache = ResultCache({}, tmp_path / "cache.pkl", force_invalid=True)
+    saved_bytes, errors = analyze_files(files, cache, UserOptions(None), jobs=2)
+    assert not errors
+    assert saved_bytes == 3 * analyze_files(files[:1], cache, UserOptions(None), 1)[0]
+    assert saved_bytes > 0
+
+
+def test_get_file_results_type_only_without_imports():
+    code = """\
+X = const(1)
+
+def helper(): ...
+
+def use(a: helper) -> X: ...
+"""
+    errors: list[str] = []
+    results = get_file_results(code, Path("file.py"), [], errors)
+    assert not errors
+    type_only = [r for r in results if r["validator_name"] == "type_only_import"]
+    assert len(type_only) == 1
+    assert [line.split()[0] for line in type_only[0]["lines"]] == ["X", "helper"]
+
+
+def _linear_suffix_lookup(data: dict[str, list[str]], path: str) -> list[str] | None:
+    for suffix, value in data.items():
+        if path.endswith(suffix):
+            return value
+    return None
+
+
+def test_path_suffix_index_same_as_linear_lookup():
+    datas = [
+        {"utils.py": ["a"], "core/utils.py": ["b"], "/src/core/utils.py": ["c"]},
+        {"/src/core/utils.py": ["c"], "core/utils.py": ["b"], "utils.py": ["a"]},
+        {"core/utils.py": ["b"], "": ["empty"], "s.py": ["s"]},
+        {"": ["empty"], "utils.py": ["a"]},
+        {"/very/long/path/to/src/core/utils.py": ["long"]},
+        {"main.py": []},
+        {},
+    ]
+    paths = [
+        "/src/core/utils.py",
+        "/src/app/utils.py",
+        "/src/core/main.py",
+        "utils.py",
+        "s.py",
+        "",
+    ]
+    for data in datas:
+        index = PathSuffixIndex(data)
+        for path in paths:
+            assert index.get(path) == _linear_suffix_lookup(data, path), (data, path)
+
+
+def test_result_cache_save_only_when_changed(tmp_path):
+    cache_file = tmp_path / "cache.pkl"
+    cache = ResultCache({}, cache_file, force_invalid=False)
+    cache.save()
+    assert not cache_file.exists()
+
+    cache.set("file.py", {"saved_bytes": 1})  # type: ignore
+    cache.save()
+    assert ResultCache.load(cache_file).get("file.py") == {"saved_bytes": 1}
+
+    # Nothing changed since the last save
+    cache_file.write_bytes(b"untouched")
+    cache.save()
+    assert cache_file.read_bytes() == b"untouched"
+
+
+def test_result_cache_save_replaces_file_atomically(tmp_path):
+    cache_file = tmp_path / "cache.pkl"
+    cache = ResultCache({}, cache_file, force_invalid=False)
+    cache.set("file.py", {"saved_bytes": 1})  # type: ignore
+    cache.save()
+    assert list(tmp_path.iterdir()) == [cache_file]
+    original = cache_file.read_bytes()
+
+    # Failing in the middle of writing must keep the previous cache intact
+    cache.set("other.py", {"saved_bytes": lambda: 2})  # type: ignore
+    with pytest.raises((pickle.PicklingError, AttributeError)):
+        cache.save()
+    assert cache_file.read_bytes() == original